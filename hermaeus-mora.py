@@ -2,9 +2,13 @@
 Hermaeus Mora — DB ingester
 ---------------------------
 
-Consumes the `watcher.watch` stream and writes each measurement into an
-SQLite database table `samples(timestamp TEXT, source TEXT, channel TEXT,
-value REAL, extra TEXT)`.
+Consumes the `watcher.watch_batches` stream and writes each measurement into an
+SQLite database table `samples(timestamp INTEGER, source_id INTEGER,
+channel_id INTEGER, value REAL, extra TEXT)`; timestamps are stored as
+microseconds since the Unix epoch and source/channel names live in the
+`sources`/`channels` lookup tables (see the `samples_view` view). Writes
+happen on a background thread fed through a bounded queue, so commits never
+stall the watcher.
 
 Usage:
     python hermaeus-mora.py --dir <watch_dir> --db <db_path> [--backfill]
@@ -18,11 +22,16 @@ from __future__ import annotations
 
 import argparse
 import os
+import queue
 import signal
 import sqlite3
 import sys
+import threading
 import time
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import chain
+from typing import Optional, Union
 
 import watcher
 
@@ -42,110 +51,334 @@ def _handle_sigint(signum, frame):
     print("Stopping after current batch...")
 
 
-def _connect_db(db_path: str) -> sqlite3.Connection:
-    # Ensure parent directory exists
-    parent = os.path.dirname(db_path)
-    if parent:
-        os.makedirs(parent, exist_ok=True)
+# PRAGMA user_version of the current `samples` schema:
+#   0 - legacy: TEXT timestamps as written in the CSV
+#   1 - INTEGER timestamps, microseconds since the Unix epoch
+#   2 - source/channel moved to lookup tables, referenced by integer id
+#   3 - WITHOUT ROWID table keyed on (timestamp, source_id, channel_id);
+#       the synthetic `id` column is gone
+SCHEMA_VERSION = 3
+
+# The (timestamp, source_id, channel_id) primary key makes OR IGNORE the dedupe
+_INSERT_PREFIX = "INSERT OR IGNORE INTO samples (timestamp, source_id, channel_id, value, extra) VALUES "
+_INSERT_SQL = _INSERT_PREFIX + "(?, ?, ?, ?, ?)"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_US = timedelta(microseconds=1)
+# Tried in order after datetime.fromisoformat
+_TIMESTAMP_FORMATS = (
+    "%m/%d/%Y %H:%M:%S.%f",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y %I:%M:%S.%f %p",
+    "%m/%d/%Y %I:%M:%S %p",
+)
+
+
+@lru_cache(maxsize=4096)
+def _timestamp_value(ts: str) -> Union[int, str]:
+    """Convert a CSV timestamp to integer microseconds since the Unix epoch.
+
+    Naive timestamps are taken as local time (BenchVue writes the PC clock).
+    Strings that match no known format are returned unchanged so no data is
+    lost; SQLite stores them as TEXT in the INTEGER column. Cached because
+    every channel of a scan row shares the same timestamp string.
+    """
+    text = ts.strip()
+    try:
+        dt = datetime.fromisoformat(text)
+    except ValueError:
+        for fmt in _TIMESTAMP_FORMATS:
+            try:
+                dt = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            return ts
+    return (dt.astimezone(timezone.utc) - _EPOCH) // _ONE_US
 
-    conn = sqlite3.connect(db_path)
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    # source/channel names are few and repeated on every row, so samples
+    # stores small integer ids into these lookup tables instead.
+    conn.execute("CREATE TABLE IF NOT EXISTS sources (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    conn.execute("CREATE TABLE IF NOT EXISTS channels (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
     conn.execute(
         """
         CREATE TABLE IF NOT EXISTS samples (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp TEXT NOT NULL,
-            source TEXT NOT NULL,
-            channel TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,
+            source_id INTEGER NOT NULL REFERENCES sources(id),
+            channel_id INTEGER NOT NULL REFERENCES channels(id),
             value REAL,
-            extra TEXT
-        )
+            extra TEXT,
+            PRIMARY KEY (timestamp, source_id, channel_id)
+        ) WITHOUT ROWID
+        """
+    )
+    # Read-compatible view with the names resolved
+    conn.execute(
+        """
+        CREATE VIEW IF NOT EXISTS samples_view AS
+        SELECT s.timestamp, src.name AS source, ch.name AS channel, s.value, s.extra
+        FROM samples s
+        JOIN sources src ON src.id = s.source_id
+        JOIN channels ch ON ch.id = s.channel_id
         """
     )
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_samples_timestamp ON samples(timestamp)")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_samples_source ON samples(source)")
-    conn.commit()
-    return conn
 
 
-def _has_unique_dedup_index(db: sqlite3.Connection) -> bool:
-    try:
-        rows = db.execute("PRAGMA index_list(samples)").fetchall()
-    except sqlite3.DatabaseError:
-        return False
-    for row in rows:
-        # row schema: seq, name, unique, origin, partial
-        name = row[1]
-        unique = row[2]
-        if unique != 1:
-            continue
-        try:
-            info = db.execute(f"PRAGMA index_info({name})").fetchall()
-        except sqlite3.DatabaseError:
-            continue
-        cols = [r[2] for r in info]
-        if cols == ["timestamp", "source", "channel"]:
-            return True
-    return False
-
-
-def _ensure_unique_index(db: sqlite3.Connection) -> bool:
-    if _has_unique_dedup_index(db):
-        return True
-    try:
-        db.execute(
-            "CREATE UNIQUE INDEX IF NOT EXISTS uniq_samples_key ON samples(timestamp, source, channel)"
-        )
-        db.commit()
-    except sqlite3.DatabaseError:
-        try:
-            db.rollback()
-        except Exception:
-            pass
-    return _has_unique_dedup_index(db)
-
-
-def _insert_sample(
-    db: sqlite3.Connection,
-    ts: str,
-    source: str,
-    channel: str,
-    value,
-    extra: Optional[str] = None,
-    use_or_ignore: bool = False,
-):
-    if use_or_ignore:
-        db.execute(
-            "INSERT OR IGNORE INTO samples (timestamp, source, channel, value, extra) VALUES (?, ?, ?, ?, ?)",
-            (ts, source, channel, value, extra),
+def _migrate_samples(conn: sqlite3.Connection, version: int) -> None:
+    # Rebuild a pre-SCHEMA_VERSION samples table in the current layout.
+    # Old secondary indexes go with the old table; the primary key replaces
+    # them, and OR IGNORE drops any duplicate keys the old table held.
+    print(f"Migrating samples table from schema {version} to {SCHEMA_VERSION} (one-time)...")
+    conn.create_function("_timestamp_value", 1, _timestamp_value, deterministic=True)
+    ts_expr = "_timestamp_value(o.timestamp)" if version < 1 else "o.timestamp"
+    if version < 2:
+        select = (
+            f"SELECT {ts_expr}, src.id, ch.id, o.value, o.extra FROM samples_old o "
+            "JOIN sources src ON src.name = o.source "
+            "JOIN channels ch ON ch.name = o.channel"
         )
     else:
-        db.execute(
-            (
-                "INSERT INTO samples (timestamp, source, channel, value, extra)\n"
-                "SELECT ?, ?, ?, ?, ?\n"
-                "WHERE NOT EXISTS (\n"
-                "  SELECT 1 FROM samples WHERE timestamp = ? AND source = ? AND channel = ?\n"
-                ")"
-            ),
-            (ts, source, channel, value, extra, ts, source, channel),
+        select = "SELECT o.timestamp, o.source_id, o.channel_id, o.value, o.extra FROM samples_old o"
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DROP VIEW IF EXISTS samples_view")
+        conn.execute("ALTER TABLE samples RENAME TO samples_old")
+        _create_schema(conn)
+        if version < 2:
+            conn.execute("INSERT OR IGNORE INTO sources (name) SELECT DISTINCT source FROM samples_old")
+            conn.execute("INSERT OR IGNORE INTO channels (name) SELECT DISTINCT channel FROM samples_old")
+        conn.execute(
+            "INSERT OR IGNORE INTO samples (timestamp, source_id, channel_id, value, extra) " + select
         )
+        conn.execute("DROP TABLE samples_old")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _dimension_id(db: sqlite3.Connection, table: str, name: str, cache: dict) -> int:
+    """Return the id of `name` in the `sources`/`channels` table, adding it if new."""
+    try:
+        return cache[name]
+    except KeyError:
+        pass
+    db.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,))
+    row_id = db.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()[0]
+    cache[name] = row_id
+    return row_id
+
+
+def _connect_db(db_path: str) -> sqlite3.Connection:
+    # Ensure parent directory exists (an existing DB file implies it does)
+    parent = os.path.dirname(db_path)
+    if parent and not os.path.isfile(db_path):
+        os.makedirs(parent, exist_ok=True)
+
+    # Autocommit mode: transactions are managed explicitly per commit window
+    conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    # WAL turns each commit into a single append+fsync and lets readers run
+    # alongside the ingester; NORMAL is durable across application crashes.
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")  # 64 MiB
+        conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+        conn.execute("PRAGMA wal_autocheckpoint=1000")
+    except sqlite3.DatabaseError:
+        pass
+
+    # The PRAGMAs above are per-connection; the schema only needs work when
+    # user_version says it is missing or older than this script
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version == SCHEMA_VERSION:
+        return conn
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'samples'"
+    ).fetchone()
+    if exists and version < SCHEMA_VERSION:
+        _migrate_samples(conn, version)
+    elif not exists:
+        _create_schema(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return conn
+
+
+# Rows per multi-row INSERT at 5 parameters each: 500 stays well under the
+# 32766 variable limit of SQLite 3.32+; older system SQLite builds allow
+# only 999, so 199 rows there
+_ROWS_PER_STATEMENT = 500 if sqlite3.sqlite_version_info >= (3, 32, 0) else 199
+
+
+@lru_cache(maxsize=None)
+def _multi_insert_sql(n: int) -> str:
+    # Cached per row count so full chunks always reuse one compiled statement
+    if n == 1:
+        return _INSERT_SQL
+    return _INSERT_PREFIX + ", ".join(["(?, ?, ?, ?, ?)"] * n)
+
+
+def _flush_pending(cur: sqlite3.Cursor, pending: list) -> int:
+    """Write buffered rows in a single transaction and return how many were inserted."""
+    if not pending:
+        return 0
+    cur.execute("BEGIN IMMEDIATE")
+    added = 0
+    try:
+        # One statement per chunk of rows; only the tail chunk has a new shape
+        for start in range(0, len(pending), _ROWS_PER_STATEMENT):
+            chunk = pending[start:start + _ROWS_PER_STATEMENT]
+            cur.execute(_multi_insert_sql(len(chunk)), list(chain.from_iterable(chunk)))
+            # OR IGNORE skips are not counted
+            added += cur.rowcount
+    except BaseException:
+        cur.execute("ROLLBACK")
+        raise
+    cur.execute("COMMIT")
+    pending.clear()
+    return added
 
 
 def _tune_for_backfill(db: sqlite3.Connection, aggressive: bool) -> None:
+    # _connect_db already applies WAL/NORMAL; only --fast-backfill goes further
+    if not aggressive:
+        return
     try:
-        if aggressive:
-            # Fastest but reduces durability during the run
-            db.execute("PRAGMA journal_mode=MEMORY")
-            db.execute("PRAGMA synchronous=OFF")
-        else:
-            # Safer defaults that are still faster for bulk loads
-            db.execute("PRAGMA journal_mode=WAL")
-            db.execute("PRAGMA synchronous=NORMAL")
-        db.execute("PRAGMA temp_store=MEMORY")
+        # Bulk-load settings: no journal, no fsync, one exclusive lock for the
+        # whole run. A crash mid-run can corrupt the DB, so this is opt-in.
+        db.execute("PRAGMA locking_mode=EXCLUSIVE")
+        db.execute("PRAGMA journal_mode=OFF")
+        db.execute("PRAGMA synchronous=OFF")
+        db.execute("PRAGMA cache_size=-1048576")  # 1 GiB
     except sqlite3.DatabaseError:
         pass
 
 
+def _to_db_rows(db: sqlite3.Connection, pending: list, source_ids: dict, channel_ids: dict) -> list:
+    """Convert buffered measurements into `samples` rows (integer timestamp and ids)."""
+    # Resolve names new to this run first, so the per-row pass is a single
+    # comprehension of dict lookups plus the cached timestamp conversion
+    for name in {row[1] for row in pending}.difference(source_ids):
+        _dimension_id(db, "sources", name, source_ids)
+    for name in {row[2] for row in pending}.difference(channel_ids):
+        _dimension_id(db, "channels", name, channel_ids)
+    ts_value = _timestamp_value
+    return [
+        (ts_value(ts), source_ids[source], channel_ids[channel], value, extra)
+        for ts, source, channel, value, extra in pending
+    ]
+
+
+def _sort_pending(pending: list) -> None:
+    # Rows arrive interleaved by file; inserting in key order keeps the
+    # clustered primary-key B-tree appends mostly sequential. SQLite orders
+    # integers before text, which also keeps unparsed timestamps comparable.
+    pending.sort(key=lambda row: (isinstance(row[0], str), row[0], row[1], row[2]))
+
+
+def _writer(
+    q: "queue.Queue[Optional[list]]",
+    db_path: str,
+    *,
+    commit_every: int,
+    commit_seconds: float,
+    backfill: bool,
+    fast_backfill: bool,
+    show_progress: bool,
+    stats: dict,
+) -> None:
+    """Drain measurement batches from `q` and write them to SQLite in commit windows.
+
+    Runs on its own thread with its own connection so commits (and their
+    fsyncs) never stall the watcher. A `None` item flushes and stops it.
+    """
+    db = _connect_db(db_path)
+    # If we're doing backfill, tune SQLite for faster bulk loads
+    if backfill:
+        _tune_for_backfill(db, aggressive=fast_backfill)
+    bulk = backfill and fast_backfill
+    cur = db.cursor()
+
+    inserted = 0
+    # Monotonic deadline: immune to wall-clock jumps, compared as plain ints
+    commit_ns = int(commit_seconds * 1e9)
+    next_commit_ns = time.monotonic_ns() + commit_ns
+    pending: list[tuple] = []
+    source_ids: dict[str, int] = {}
+    channel_ids: dict[str, int] = {}
+
+    done = False
+    try:
+        while not done:
+            # Block for the next item, bounded by the current commit deadline
+            timeout = None
+            if pending:
+                timeout = max(0.0, (next_commit_ns - time.monotonic_ns()) / 1e9)
+            try:
+                item = q.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                pending.extend(item)
+                # Take whatever else is already queued without blocking
+                while len(pending) < commit_every:
+                    try:
+                        item = q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        done = True
+                        break
+                    pending.extend(item)
+
+            if len(pending) >= commit_every or time.monotonic_ns() >= next_commit_ns:
+                # A single queued batch can hold a whole file's backlog, so
+                # write it in commit_every slices, one transaction each
+                for start in range(0, len(pending), commit_every):
+                    part = pending[start:start + commit_every]
+                    ts, source, channel = part[-1][:3]
+                    rows = _to_db_rows(db, part, source_ids, channel_ids)
+                    if bulk:
+                        _sort_pending(rows)
+                    # Dedupe may skip rows, so report what was actually stored
+                    added = _flush_pending(cur, rows)
+                    inserted += added
+                    if show_progress and added:
+                        # One line per commit window; the raw CSV row timestamp is shown with no conversion
+                        print(f"[{ts}] +{added} rows (latest {source}|{channel})")
+                        sys.stdout.flush()
+                pending.clear()
+                next_commit_ns = time.monotonic_ns() + commit_ns
+    except BaseException as exc:
+        stats["error"] = exc
+        raise
+    finally:
+        try:
+            rows = _to_db_rows(db, pending, source_ids, channel_ids)
+            if bulk:
+                _sort_pending(rows)
+            inserted += _flush_pending(cur, rows)
+        finally:
+            try:
+                db.execute("COMMIT")
+            except sqlite3.OperationalError:
+                pass  # no transaction open
+            try:
+                # Keep planner statistics fresh for long-running ingesters
+                db.execute("PRAGMA optimize")
+            except sqlite3.DatabaseError:
+                pass
+            db.close()
+            stats["inserted"] = inserted
+
+
 def main(argv: Optional[list[str]] = None) -> int:
     parser = argparse.ArgumentParser(description="Ingest BenchVue CSV updates into SQLite")
     parser.add_argument(
@@ -171,7 +404,7 @@ def main(argv: Optional[list[str]] = None) -> int:
         "--no-progress",
         dest="no_progress",
         action="store_true",
-        help="Disable per-insert progress indicator output",
+        help="Disable per-commit progress indicator output",
     )
     parser.add_argument(
         "--fast-backfill",
@@ -199,21 +432,10 @@ def main(argv: Optional[list[str]] = None) -> int:
     signal.signal(signal.SIGINT, _handle_sigint)
     signal.signal(signal.SIGTERM, _handle_sigint)
 
+    # Schema setup and any migration happen up front; the writer opens its own connection
     db = _connect_db(args.db_path)
-    # Attempt to add a unique index to let us use INSERT OR IGNORE
-    has_unique = _ensure_unique_index(db)
-
-    # If we're doing backfill, tune SQLite for faster bulk loads
-    if args.backfill:
-        _tune_for_backfill(db, aggressive=args.fast_backfill)
+    db.close()
 
-    attempts = 0
-    base_changes = 0
-    try:
-        base_changes = db.total_changes
-    except Exception:
-        base_changes = 0
-    last_commit = time.time()
     # Auto-tune default batching; allow override via --commit-rows
     commit_every = 250  # rows
     commit_seconds = 2.0  # seconds
@@ -223,42 +445,56 @@ def main(argv: Optional[list[str]] = None) -> int:
     if args.commit_rows is not None and args.commit_rows > 0:
         commit_every = args.commit_rows
 
+    # Bounded so a stalled writer applies backpressure instead of growing memory;
+    # items are batches of up to watcher.MAX_BATCH_ROWS measurements each
+    q: "queue.Queue[Optional[list]]" = queue.Queue(maxsize=1_000)
+    stats: dict = {}
+    writer = threading.Thread(
+        target=_writer,
+        args=(q, args.db_path),
+        kwargs=dict(
+            commit_every=commit_every,
+            commit_seconds=commit_seconds,
+            backfill=args.backfill,
+            fast_backfill=args.fast_backfill,
+            show_progress=not args.no_progress,
+            stats=stats,
+        ),
+        name="sqlite-writer",
+        daemon=True,
+    )
+    writer.start()
+
     try:
-        show_progress = not args.no_progress
-        for ts, source, channel, value, extra in watcher.watch(
+        # One queue item per file per poll rather than per measurement
+        for batch in watcher.watch_batches(
             args.directory,
             poll_interval=args.interval,
             backfill=args.backfill,
             should_stop=lambda: STOP,
         ):
-            # Track whether an insert actually occurred (dedupe may skip it)
-            before = db.total_changes
-            _insert_sample(db, ts, source, channel, value, extra, use_or_ignore=has_unique)
-            after = db.total_changes
-            attempts += 1
-
-            if show_progress and after > before:
-                # Show the raw CSV row timestamp with no conversion
-                print(f"[{ts}] +1 row -> {source} | {channel}", flush=True)
-
-            now = time.time()
-            if attempts % commit_every == 0 or (now - last_commit) >= commit_seconds:
-                db.commit()
-                last_commit = now
-
-            if STOP:
+            while True:
+                try:
+                    q.put(batch, timeout=1.0)
+                    break
+                except queue.Full:
+                    if not writer.is_alive():
+                        break
+            if STOP or not writer.is_alive():
                 break
     finally:
-        db.commit()
-        changes = 0
-        try:
-            changes = db.total_changes - base_changes
-        except Exception:
-            pass
-        db.close()
-        print(f"Inserted rows: {changes}")
+        # Same timed put as above: a writer that dies while draining a full
+        # queue must not leave us blocked on the sentinel
+        while writer.is_alive():
+            try:
+                q.put(None, timeout=1.0)
+                writer.join()
+                break
+            except queue.Full:
+                pass
+        print(f"Inserted rows: {stats.get('inserted', 0)}")
 
-    return 0
+    return 1 if "error" in stats else 0
 
 
 if __name__ == "__main__":
@@ -4,11 +4,14 @@
 Watcher module
 ---------------
 
-Exposes a `watch` generator which monitors a directory for CSV files that
-BenchVue appends to. It detects the header row ("Scan Sweep Time (Sec),Scan Number,...")
-and then yields measurements for any new data rows appended to each file.
-
-Yielded measurement tuple:
+Exposes `watch_batches` and `watch` generators which monitor a directory for
+CSV files that BenchVue appends to. They detect the header row
+("Scan Sweep Time (Sec),Scan Number,...") and then yield measurements for any
+new data rows appended to each file: `watch_batches` yields per-file lists
+of up to `MAX_BATCH_ROWS` measurements, `watch` flattens those into single
+tuples.
+
+Measurement tuple:
     (timestamp_str, source, channel, value_float, extra_filename)
 
 Where:
@@ -22,23 +25,52 @@ Notes:
     - Handles new files appearing and existing files growing.
     - By default starts tailing at end-of-file to avoid backfilling old data; this
       can be changed with the `backfill=True` argument.
+    - If the optional `watchdog` package is installed, file-change events drive
+      reads; otherwise the directory is polled.
+    - Discovery, reads and parsing run on a background `watcher-poll` thread
+      that feeds the generator through a bounded queue; `should_stop` is
+      called from that thread.
 """
 
 from __future__ import annotations
 
 import csv
-import glob
 import io
+import mmap
+import operator
 import os
+import queue
 import re
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Callable, Dict, Generator, Iterable, List, Optional, Tuple
+from typing import BinaryIO, Callable, ClassVar, Dict, Generator, Iterable, List, Optional, Tuple
+
+try:
+    # Optional: event-driven wakeups instead of fixed-interval polling
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
 
 
 HEADER_LEADER = "Scan Sweep Time (Sec)"
+HEADER_LEADER_BYTES = HEADER_LEADER.encode()
 FILENAME_SOURCE_RE = re.compile(r"AutoExportTrace_([^\s]+)\s", re.IGNORECASE)
-CSV_GLOB = "AutoExportTrace_*.csv"
+CSV_PREFIX = os.path.normcase("AutoExportTrace_")
+CSV_SUFFIX = os.path.normcase(".csv")
+
+# An open handle stops Windows from deleting or renaming the file, so one
+# that has not grown for this long is closed; the next change reopens it
+IDLE_CLOSE_SECONDS = 10.0
+
+
+def _is_trace_csv(name: str) -> bool:
+    # normcase keeps Windows matching case-insensitive, like glob did
+    name = os.path.normcase(name)
+    return name.startswith(CSV_PREFIX) and name.endswith(CSV_SUFFIX)
 
 
 def _parse_source_from_filename(path: str) -> str:
@@ -61,7 +93,111 @@ def _parse_source_from_filename(path: str) -> str:
     return src
 
 
-@dataclass
+def _is_header_row(row: List[str]) -> bool:
+    # Detect header row robustly: second column literally says Scan Number
+    return len(row) > 1 and row[1].strip().lower() == "scan number"
+
+
+def _find_header(buf, start: int, encoding: str) -> Tuple[Optional[List[str]], int]:
+    """Find the header row in `buf` (bytes or mmap) at or after `start`.
+
+    Returns `(row, offset just past the header line)`, or `(None, offset)`
+    where `offset` is where a later search should resume: the start of a
+    line still being written, or the end of the buffer.
+    """
+    off = start
+    while True:
+        hit = buf.find(HEADER_LEADER_BYTES, off)
+        if hit < 0:
+            return None, max(start, buf.rfind(b"\n", start) + 1)
+        prev_nl = buf.rfind(b"\n", start, hit)
+        line_start = prev_nl + 1 if prev_nl >= 0 else start
+        nl = buf.find(b"\n", hit)
+        if nl < 0:
+            # Header line is still being written
+            return None, line_start
+        line = buf[line_start:nl].decode(encoding, errors="ignore").rstrip("\r")
+        row = next(csv.reader([line]))
+        if _is_header_row(row):
+            return row, nl + 1
+        off = nl + 1
+
+
+def _emit_rows(
+    rows: Iterable[List[str]],
+    channels: List[str],
+    getter: Callable[[List[str]], Tuple[str, ...]],
+    min_len: int,
+    source: str,
+    extra: str,
+) -> List[Tuple[str, str, str, float, str]]:
+    """Turn parsed data rows into (timestamp, source, channel, value, extra) tuples.
+
+    Self-contained so the hot loop only touches its arguments and locals.
+    """
+    produced: List[Tuple[str, str, str, float, str]] = []
+    append = produced.append
+    _float = float
+    for row in rows:
+        row_len = len(row)
+        if row_len < 2:
+            continue
+        ts = row[0].strip()
+        # Use presence of a numeric scan number to accept the row
+        # (BenchVue scan numbers are non-negative integers)
+        if not row[1].strip().isdigit():
+            continue
+        if row_len < min_len:
+            # Missing trailing cells read as blank and are skipped below
+            row += [""] * (min_len - row_len)
+        # Emit values by absolute column positions bound to named channels
+        for name, v in zip(channels, getter(row)):
+            # float() ignores surrounding whitespace itself, so only
+            # truly empty cells need the cheap test; anything else
+            # non-numeric lands in the except
+            if not v:
+                continue
+            try:
+                val = _float(v)
+            except ValueError:
+                continue
+            append((ts, source, name, val, extra))
+    return produced
+
+
+def _parse_chunk(
+    buf: bytes,
+    start: int,
+    encoding: str,
+    channels: List[str],
+    getter: Optional[Callable[[List[str]], Tuple[str, ...]]],
+    min_len: int,
+    source: str,
+    extra: str,
+) -> Tuple[List[Tuple[str, str, str, float, str]], bytes]:
+    """Parse the data rows in `buf[start:]`; returns (measurements, partial last line).
+
+    A pure function of its arguments (no FileState access), which keeps the
+    hot path friendly to PyPy's JIT and to free-threaded CPython.
+    """
+    # Split off the trailing partial line on the raw bytes, so only
+    # complete lines are decoded (a multi-byte character cut by
+    # the read boundary is no longer mangled)
+    cut = max(buf.rfind(b"\n"), buf.rfind(b"\r"), start - 1) + 1
+    if getter is None:
+        # Header named no channels: nothing to emit
+        return [], buf[cut:]
+    try:
+        text = buf[start:cut].decode(encoding, errors="ignore")
+    except Exception:
+        text = ""
+    # One csv.reader over all complete lines: the C parser splits
+    # rows itself instead of us building a list of lines first
+    rows = csv.reader(io.StringIO(text))
+    return _emit_rows(rows, channels, getter, min_len, source, extra), buf[cut:]
+
+
+@dataclass(slots=True)
 class FileState:
     path: str
     source: str
@@ -70,223 +206,436 @@ class FileState:
     channels: List[str] = field(default_factory=list)
     channel_cols: List[int] = field(default_factory=list)
     pos: int = 0  # byte offset within file
-    remainder: str = ""  # partial last line buffer
-    encoding: str = "utf-8-sig"
+    remainder_bytes: bytes = b""  # partial last line, kept undecoded
+    extra: str = field(init=False, default="")  # filename reported with each value
+    # Kept open across polls; closed after truncation, an error or IDLE_CLOSE_SECONDS idle
+    _fh: Optional[BinaryIO] = field(init=False, default=None, repr=False)
+    # Built by _set_header: projects a row onto its channel cells in one C call
+    _getter: Optional[Callable[[List[str]], Tuple[str, ...]]] = field(init=False, default=None, repr=False)
+    _min_row_len: int = field(init=False, default=0, repr=False)  # shorter rows get padded
+    # (st_size, st_mtime_ns, st_ino) by path at the last successful read
+    _last_stat: Tuple[int, int, int] = field(init=False, default=(0, 0, 0), repr=False)
+    _last_change: float = field(init=False, default=0.0, repr=False)  # time.monotonic() of that read
+    # BenchVue always writes UTF-8 with a BOM; shared, not stored per file
+    encoding: ClassVar[str] = "utf-8-sig"
+
+    def __post_init__(self) -> None:
+        # Computed once; interned so every emitted tuple shares one string object
+        self.extra = sys.intern(os.path.basename(self.path))
+        self.source = sys.intern(self.source)
+
+    def _open(self) -> BinaryIO:
+        if self._fh is None:
+            self._fh = open(self.path, "rb")
+            if hasattr(os, "posix_fadvise"):
+                # We only ever read forward; let the kernel read ahead
+                os.posix_fadvise(self._fh.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        return self._fh
+
+    def close(self) -> None:
+        """Release the file handle; the next read reopens it."""
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            finally:
+                self._fh = None
+
+    def _set_header(self, row: List[str]) -> None:
+        # Capture only non-empty channel names and their absolute column indexes
+        ch_names: List[str] = []
+        ch_cols: List[int] = []
+        for idx in range(2, len(row)):
+            name = row[idx].strip()
+            if name == "":
+                continue
+            ch_names.append(sys.intern(name))
+            ch_cols.append(idx)
+        self.channels = ch_names
+        self.channel_cols = ch_cols
+        if len(ch_cols) > 1:
+            self._getter = operator.itemgetter(*ch_cols)
+        elif ch_cols:
+            # itemgetter with one index returns a bare value, not a tuple
+            col = ch_cols[0]
+            self._getter = lambda row: (row[col],)
+        else:
+            self._getter = None
+        self._min_row_len = ch_cols[-1] + 1 if ch_cols else 0
+        self.header_found = True
 
     def ensure_header_and_position(self) -> None:
-        # Always scan from beginning once to capture header position and channels
+        # Locate the header with one mmap.find instead of reading and
+        # csv-parsing every preamble line; only the header line is parsed
+        self.header_found = False
+        self.channels = []
+        self.channel_cols = []
+        row: Optional[List[str]] = None
+        offset = size = 0
         try:
-            with open(self.path, "rb") as f:
-                self.pos = 0
-                self.header_found = False
-                while True:
-                    raw = f.readline()
-                    if not raw:
-                        break
-                    self.pos = f.tell()
-                    try:
-                        line = raw.decode(self.encoding, errors="ignore")
-                    except Exception:
-                        continue
-                    row = next(csv.reader([line]))
-                    # Detect header row robustly: second column literally says Scan Number
-                    if row and len(row) > 1 and row[1].strip().lower() == "scan number":
-                        # Capture only non-empty channel names and their absolute column indexes
-                        ch_names: List[str] = []
-                        ch_cols: List[int] = []
-                        for idx in range(2, len(row)):
-                            name = row[idx].strip()
-                            if name == "":
-                                continue
-                            ch_names.append(name)
-                            ch_cols.append(idx)
-                        self.channels = ch_names
-                        self.channel_cols = ch_cols
-                        self.header_found = True
-                        break
-                # Position after header line or end
-                if not self.header_found:
-                    # No header yet; position at current end
-                    self.channels = []
-                    self.pos = f.tell()
-        except (FileNotFoundError, PermissionError):
-            # File might race-disappear; ignore
-            pass
-
-        # If not backfilling, set position to end-of-file so we only watch new lines
-        if not self.backfill:
-            try:
-                self.pos = os.path.getsize(self.path)
-            except (FileNotFoundError, PermissionError):
-                self.pos = 0
+            f = self._open()
+            size = os.fstat(f.fileno()).st_size
+            if size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    row, offset = _find_header(mm, 0, self.encoding)
+        except (FileNotFoundError, PermissionError, ValueError):
+            # File might race-disappear, or be truncated to empty before
+            # the mmap (ValueError); ignore
+            self.close()
+            if not self.backfill:
+                # Still start at EOF so a retry does not replay old data
+                try:
+                    offset = os.path.getsize(self.path)
+                except OSError:
+                    pass
+
+        if row is not None:
+            self._set_header(row)
+            # If not backfilling, start at end-of-file so we only watch new lines
+            self.pos = offset if self.backfill else size
+        else:
+            # No complete header yet; resume the search from where it stopped
+            self.pos = offset
 
     def read_new_measurements(self) -> Iterable[Tuple[str, str, str, float, str]]:
         """Read newly appended content from the file and yield measurements.
 
         Yields tuples: (timestamp, source, channel, value, extra)
         """
-        extra = os.path.basename(self.path)
-        try:
-            size = os.path.getsize(self.path)
-        except (FileNotFoundError, PermissionError):
-            return []
-
-        # If truncated, reset position and remainder
-        if size < self.pos:
-            self.pos = 0
-            self.remainder = ""
-            self.header_found = False
-            self.channels = []
-
         produced: List[Tuple[str, str, str, float, str]] = []
 
         try:
-            with open(self.path, "rb") as f:
-                # If header not known, try to discover from current pos forward
-                if not self.header_found:
-                    f.seek(self.pos)
-                    while True:
-                        raw = f.readline()
-                        if not raw:
-                            break
-                        self.pos = f.tell()
-                        try:
-                            line = raw.decode(self.encoding, errors="ignore")
-                        except Exception:
-                            continue
-                        row = next(csv.reader([line]))
-                        if row and len(row) > 1 and row[1].strip().lower() == "scan number":
-                            ch_names: List[str] = []
-                            ch_cols: List[int] = []
-                            for idx in range(2, len(row)):
-                                name = row[idx].strip()
-                                if name == "":
-                                    continue
-                                ch_names.append(name)
-                                ch_cols.append(idx)
-                            self.channels = ch_names
-                            self.channel_cols = ch_cols
-                            self.header_found = True
-                            break
-
-                # After header, stream data rows
-                f.seek(self.pos)
-                raw_chunk = f.read()
-                if not raw_chunk:
+            # One stat by path: an unchanged fingerprint means nothing new,
+            # so an idle file costs no read at all
+            st = os.stat(self.path)
+            key = (st.st_size, st.st_mtime_ns, st.st_ino)
+            if key == self._last_stat:
+                if self._fh is not None and time.monotonic() - self._last_change >= IDLE_CLOSE_SECONDS:
+                    self.close()
+                return []
+            # A new inode means the file was replaced under our open handle
+            replaced = self._last_stat[2] not in (0, st.st_ino)
+
+            f = self._open()
+            # If truncated or replaced, reset position and remainder and reopen
+            size = st.st_size
+            if size < self.pos or replaced:
+                self.pos = 0
+                self.remainder_bytes = b""
+                self.header_found = False
+                self.channels = []
+                self.close()
+                f = self._open()
+
+            f.seek(self.pos)
+            raw_chunk = f.read()
+            # Recorded only once the read went through: a failed open must
+            # not mark the new bytes as seen, or they would never be read
+            self._last_stat = key
+            self._last_change = time.monotonic()
+            if not raw_chunk:
+                return []
+            buf = self.remainder_bytes + raw_chunk
+            start = 0
+            if not self.header_found:
+                # Preamble lines are rejected on the raw bytes with one find
+                # (remainder included, in case it holds the start of the
+                # header); only the header line itself is csv-parsed
+                row, start = _find_header(buf, 0, self.encoding)
+                if row is None:
+                    self.remainder_bytes = buf[start:]
+                    self.pos += len(raw_chunk)
                     return []
-                try:
-                    chunk = raw_chunk.decode(self.encoding, errors="ignore")
-                except Exception:
-                    chunk = ""
-                data = self.remainder + chunk
-                lines = data.splitlines(keepends=True)
-                # Keep last line if not newline-terminated
-                if lines and not (lines[-1].endswith("\n") or lines[-1].endswith("\r")):
-                    self.remainder = lines[-1]
-                    lines = lines[:-1]
-                else:
-                    self.remainder = ""
-
-                reader = csv.reader([ln.rstrip("\r\n") for ln in lines])
-                for row in reader:
-                    # Skip until header appears
-                    if not self.header_found:
-                        if row and len(row) > 1 and row[1].strip().lower() == "scan number":
-                            ch_names: List[str] = []
-                            ch_cols: List[int] = []
-                            for idx in range(2, len(row)):
-                                name = row[idx].strip()
-                                if name == "":
-                                    continue
-                                ch_names.append(name)
-                                ch_cols.append(idx)
-                            self.channels = ch_names
-                            self.channel_cols = ch_cols
-                            self.header_found = True
-                        continue
-
-                    if not row or len(row) < 2:
-                        continue
-                    ts = row[0].strip()
-                    # Use presence of a numeric scan number to accept the row
-                    scan_str = row[1].strip() if len(row) > 1 else ""
-                    try:
-                        int(scan_str)
-                    except Exception:
-                        continue
-                    # Emit values by absolute column positions bound to named channels
-                    if not self.channels or not self.channel_cols:
-                        continue
-                    for name, col in zip(self.channels, self.channel_cols):
-                        if col >= len(row):
-                            continue
-                        v = row[col].strip()
-                        if v == "":
-                            continue
-                        try:
-                            val = float(v)
-                        except ValueError:
-                            continue
-                        produced.append((ts, self.source, name, val, extra))
-
-                # Advance position by number of bytes we consumed
-                self.pos += len(raw_chunk)
+                self._set_header(row)
+            produced, self.remainder_bytes = _parse_chunk(
+                buf,
+                start,
+                self.encoding,
+                self.channels,
+                self._getter,
+                self._min_row_len,
+                self.source,
+                self.extra,
+            )
+
+            # Advance position by number of bytes we consumed
+            self.pos += len(raw_chunk)
         except (FileNotFoundError, PermissionError):
             # File vanished mid-read
+            self.close()
             return []
 
         return produced
 
 
-def watch(
+# With file events driving reads, a full rescan still runs this often to
+# catch anything the OS did not report (e.g. appends Windows reports late)
+SAFETY_RESCAN_SECONDS = 30.0
+
+
+class _PollBackend:
+    """Fixed-interval polling: every wakeup is a full rescan."""
+
+    def __init__(self, directory: str, poll_interval: float, stop: threading.Event) -> None:
+        self.poll_interval = poll_interval
+        self._stop = stop
+
+    def wait(self) -> Optional[set]:
+        # Returns as soon as the consumer goes away, not a poll later
+        self._stop.wait(self.poll_interval)
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+class _WatchdogBackend:
+    """File-event wakeups via `watchdog` (ReadDirectoryChangesW / inotify).
+
+    `wait` returns the set of changed CSV paths (possibly empty), or None
+    when the periodic safety-net rescan is due. Events arrive on `changed`;
+    whoever sets `stop` also puts an empty string there to cut a wait short.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        poll_interval: float,
+        stop: threading.Event,
+        changed: "queue.Queue[str]",
+        rescan_interval: float = SAFETY_RESCAN_SECONDS,
+    ) -> None:
+        # poll_interval only bounds how long `wait` blocks, so should_stop stays responsive
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self._next_rescan = time.monotonic() + rescan_interval
+        self._stop = stop
+        self._changed = changed
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event) -> None:
+                # Ignore opened/closed-no-write events, which our own reads trigger
+                if event.is_directory or event.event_type not in ("created", "modified", "moved"):
+                    return
+                path = getattr(event, "dest_path", "") or event.src_path
+                name = os.path.basename(path)
+                if _is_trace_csv(name):
+                    # Same spelling as the scandir paths so the `tracked` keys line up
+                    changed.put(os.path.join(directory, name))
+
+        self._observer = Observer()
+        self._observer.schedule(_Handler(), directory, recursive=False)
+        self._observer.start()
+
+    def wait(self) -> Optional[set]:
+        if time.monotonic() >= self._next_rescan:
+            self._next_rescan = time.monotonic() + self.rescan_interval
+            return None
+        try:
+            dirty = {self._changed.get(timeout=self.poll_interval)}
+        except queue.Empty:
+            return set()
+        if self._stop.is_set():
+            return set()
+        # Coalesce the burst of events a single append produces
+        while True:
+            try:
+                dirty.add(self._changed.get_nowait())
+            except queue.Empty:
+                dirty.discard("")
+                return dirty
+
+    def close(self) -> None:
+        self._observer.stop()
+        self._observer.join()
+
+
+def _make_backend(directory: str, poll_interval: float, stop: threading.Event, changed: "queue.Queue[str]"):
+    if Observer is not None:
+        try:
+            return _WatchdogBackend(directory, poll_interval, stop, changed)
+        except OSError:
+            # e.g. inotify watch limit reached; polling still works
+            pass
+    return _PollBackend(directory, poll_interval, stop)
+
+
+# Batches the watcher thread may get ahead of a slow consumer by
+QUEUE_MAXSIZE = 1_000
+# Largest batch handed over at once; a backfill read is split into these so
+# a bounded queue of batches also bounds memory
+MAX_BATCH_ROWS = 1_000
+_SENTINEL = object()  # end of stream from the watcher thread
+
+# Shared by all watch() calls; workers are only started once files need reading
+_EXECUTOR = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 4), thread_name_prefix="watcher-read")
+
+
+def _read_files(states: List[FileState]) -> List[List[Tuple[str, str, str, float, str]]]:
+    # Read files concurrently so one large backfill does not hold up the
+    # others; each FileState is only ever touched by one worker at a time
+    if len(states) < 2:
+        return [st.read_new_measurements() for st in states]
+    futures = [_EXECUTOR.submit(st.read_new_measurements) for st in states]
+    return [fut.result() for fut in futures]
+
+
+def _track_new_files(directory: str, tracked: Dict[str, FileState], backfill: bool) -> set:
+    # Discover new files; returns every path currently present
+    seen = set()
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if _is_trace_csv(entry.name) and entry.is_file():
+                    seen.add(os.path.join(directory, entry.name))
+    except FileNotFoundError:
+        # Folder gone (e.g. network share dropped): nothing is present
+        pass
+    for path in seen:
+        if path not in tracked:
+            src = _parse_source_from_filename(path)
+            st = FileState(path=path, source=src, backfill=backfill)
+            st.ensure_header_and_position()
+            tracked[path] = st
+    return seen
+
+
+def _poll_loop(
+    directory: str,
+    poll_interval: float,
+    backfill: bool,
+    should_stop: Optional[Callable[[], bool]],
+    out: "queue.Queue[object]",
+    stop: threading.Event,
+    changed: "queue.Queue[str]",
+    errors: List[BaseException],
+) -> None:
+    # Runs on the watcher thread: discovery, reads and parsing, pushing each
+    # file's new measurements into `out` in batches. Ends with _SENTINEL unless the
+    # consumer has already gone away.
+    def put(item: object) -> bool:
+        # Bounded put that still notices the consumer leaving within half a second
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=min(poll_interval, 0.5))
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    tracked: Dict[str, FileState] = {}
+    backend = None
+    try:
+        # Initial discovery
+        _track_new_files(directory, tracked, backfill)
+
+        backend = _make_backend(directory, poll_interval, stop, changed)
+        dirty: Optional[set] = None  # None: rescan and read every file
+        while not stop.is_set():
+            if should_stop and should_stop():
+                return
+
+            if dirty is None:
+                seen = _track_new_files(directory, tracked, backfill)
+
+                # Drop files that disappeared; the scan already says what exists
+                for path in tracked.keys() - seen:
+                    tracked.pop(path).close()
+
+                # Pull new data from each file; an idle one costs a single stat
+                states = list(tracked.values())
+            else:
+                states = []
+                for path in dirty:
+                    st = tracked.get(path)
+                    if st is None:
+                        if not os.path.exists(path):
+                            continue
+                        st = FileState(path=path, source=_parse_source_from_filename(path), backfill=backfill)
+                        st.ensure_header_and_position()
+                        tracked[path] = st
+                    states.append(st)
+            for produced in _read_files(states):
+                for start in range(0, len(produced), MAX_BATCH_ROWS):
+                    if not put(produced[start:start + MAX_BATCH_ROWS]):
+                        return
+
+            dirty = backend.wait()
+    except BaseException as exc:
+        errors.append(exc)
+    finally:
+        if backend is not None:
+            backend.close()
+        for st in tracked.values():
+            st.close()
+        put(_SENTINEL)
+
+
+def watch_batches(
     directory: str,
     *,
     poll_interval: float = 1.0,
     backfill: bool = False,
     should_stop: Optional[Callable[[], bool]] = None,
-) -> Generator[Tuple[str, str, str, float, str], None, None]:
-    """Watch `directory` for AutoExportTrace CSV files and yield measurements.
+) -> Generator[List[Tuple[str, str, str, float, str]], None, None]:
+    """Watch `directory` for AutoExportTrace CSV files and yield measurements
+    in batches: non-empty lists of up to `MAX_BATCH_ROWS` measurements, each
+    from a single file, in file order.
+
+    Polling and parsing run on a background thread that keeps reading
+    while the caller is busy, up to `QUEUE_MAXSIZE` batches ahead.
+    With `watchdog` installed the OS wakes us when a file changes
+    (ReadDirectoryChangesW on Windows, inotify on Linux) and only that file
+    is read; a full rescan still runs every `SAFETY_RESCAN_SECONDS`.
+    Without it, the directory is polled every `poll_interval` seconds.
 
     Args:
         directory: Folder to monitor
-        poll_interval: Seconds between polls
+        poll_interval: Seconds between polls (with watchdog: between stop checks)
         backfill: If True, process historical lines already in files at startup
-        should_stop: Optional callable that returns True to stop watching
+        should_stop: Optional callable that returns True to stop watching;
+            called from the watcher thread
     """
-    tracked: Dict[str, FileState] = {}
-
-    # Initial discovery
-    for path in glob.glob(os.path.join(directory, CSV_GLOB)):
-        src = _parse_source_from_filename(path)
-        st = FileState(path=path, source=src, backfill=backfill)
-        st.ensure_header_and_position()
-        tracked[path] = st
+    out: "queue.Queue[object]" = queue.Queue(maxsize=QUEUE_MAXSIZE)
+    stop = threading.Event()
+    changed: "queue.Queue[str]" = queue.Queue()  # watchdog events, plus the wakeup on close
+    errors: List[BaseException] = []
+    thread = threading.Thread(
+        target=_poll_loop,
+        args=(directory, poll_interval, backfill, should_stop, out, stop, changed, errors),
+        name="watcher-poll",
+        daemon=True,
+    )
+    thread.start()
+    try:
+        while True:
+            # Timed get so Ctrl+C still reaches the main thread on Windows
+            try:
+                batch = out.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if batch is _SENTINEL:
+                if errors:
+                    raise errors[0]
+                return
+            yield batch
+    finally:
+        stop.set()
+        changed.put("")
+        thread.join()
 
-    while True:
-        if should_stop and should_stop():
-            return
-
-        # Discover new files
-        seen = set()
-        for path in glob.glob(os.path.join(directory, CSV_GLOB)):
-            seen.add(path)
-            if path not in tracked:
-                src = _parse_source_from_filename(path)
-                st = FileState(path=path, source=src, backfill=backfill)
-                st.ensure_header_and_position()
-                tracked[path] = st
-
-        # Drop files that disappeared
-        for path in list(tracked.keys()):
-            if path not in seen and not os.path.exists(path):
-                tracked.pop(path, None)
-
-        # Pull new data from each file
-        for st in tracked.values():
-            for meas in st.read_new_measurements():
-                yield meas
 
-        time.sleep(poll_interval)
+def watch(
+    directory: str,
+    *,
+    poll_interval: float = 1.0,
+    backfill: bool = False,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> Generator[Tuple[str, str, str, float, str], None, None]:
+    """Like `watch_batches`, but yield one measurement tuple at a time."""
+    for batch in watch_batches(
+        directory, poll_interval=poll_interval, backfill=backfill, should_stop=should_stop
+    ):
+        yield from batch
 
 
 if __name__ == "__main__":